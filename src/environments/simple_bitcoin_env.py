@@ -2,12 +2,18 @@
 Environment module for a simplified Bitcoin mining simulation using OpenAI Gym.
 Defines the SimpleBitcoinEnv class and transaction generation utilities.
 """
+from typing import Optional
 import gym
 import numpy as np
 from gym import spaces
-from src.config.constants import VERSION, PREVIOUS_BLOCK_HASH, BITS, BASE_TIMESTAMP, TRANSACTIONS
-from src.utils.block import bits_to_target, compute_hash, create_coinbase_tx, txid
-from src.utils.merkle import merkle_root
+from src.config.constants import VERSION, PREVIOUS_BLOCK_HASH, BITS, TARGET, TARGET_BE, BASE_TIMESTAMP, TRANSACTIONS
+from src.utils.block import HEADER_PREFIX, HeaderFields, HeaderHasher, block_hash_hex, build_coinbase
+from src.utils.merkle import compile_merkle, IncrementalMerkle
+from src.utils.miner_kernel import search_nonce_range
+try:
+    from src.utils import sha256_cuda
+except ImportError:  # numba is optional
+    sha256_cuda = None
 import time
 import os
 import random
@@ -21,17 +27,29 @@ if ENABLE_LOGGING:
     )
 logger = logging.getLogger(__name__)
 
-def generate_transactions(num_txs = random.randint(5, 1000)):
+# Bound once at import: with logging disabled these are no-ops, so callers pay no branch and,
+# with %-style arguments, no message formatting.
+_log_debug = logger.debug if ENABLE_LOGGING else (lambda *args, **kwargs: None)
+_log_info = logger.info if ENABLE_LOGGING else (lambda *args, **kwargs: None)
+
+# Up to this many transactions a Python loop repairs an order faster than the fixed cost of NumPy calls
+_SMALL_PERMUTATION = 32
+
+def generate_transactions(num_txs: Optional[int] = None):
     """
     Generate a list of random transaction hashes for a new block.
+    All hashes come from a single urandom call and are viewed in place as rows of one array.
     Args:
-        num_txs (int): Number of transactions to generate (default: random between 5 and 1000).
+        num_txs (int | None): Number of transactions to generate (default: drawn between 5 and
+            1000 on every call).
     Returns:
-        list[str]: List of transaction hashes as hex strings.
+        np.ndarray: Read-only (num_txs, 32) uint8 array of transaction hashes.
     """
-    txs = [os.urandom(32).hex() for _ in range(num_txs)]
-    if ENABLE_LOGGING:
-        logger.info(f"Generated {num_txs} transactions for new block.")
+    if num_txs is None:
+        num_txs = random.randint(5, 1000)
+    # Read-only like TRANSACTIONS: the transaction set is never modified, only gathered from
+    txs = np.frombuffer(os.urandom(32 * num_txs), dtype=np.uint8).reshape(num_txs, 32)
+    _log_info("Generated %d transactions for new block.", num_txs)
     return txs
 
 class SimpleBitcoinEnv(gym.Env):
@@ -50,6 +68,7 @@ class SimpleBitcoinEnv(gym.Env):
         self.base_timestamp = BASE_TIMESTAMP
         self.transactions = TRANSACTIONS
         self.num_txs = len(self.transactions)
+        self._reset_merkle_cache()
 
         # Action space: choose nonce, extra_nonce, and permutation of transactions
         self.action_space = spaces.Dict({
@@ -68,113 +87,286 @@ class SimpleBitcoinEnv(gym.Env):
             "tx_order": spaces.MultiDiscrete([self.num_txs] * self.num_txs)
         })
 
-        self.target = bits_to_target(self.bits)
+        self.target = TARGET
+        self.target_be = TARGET_BE
 
         self.current_nonce = 0
         self.current_timestamp = self.base_timestamp
-        self.current_tx_order = list(range(self.num_txs))
+        self.current_tx_order = self._identity_order.copy()
         self.block_height = 1
-        if ENABLE_LOGGING:
-            logger.info("Environment initialized.")
+
+        # Hasher for the header of the current attempt: bytes 0-75 are rewritten only when anything
+        # but the nonce changes; a nonce sweep only hashes new nonces. Starts on a placeholder prefix.
+        self._hasher = HeaderHasher(bytes(HEADER_PREFIX.size))
+        self._header_key = None
+        # Observation array for previousblockhash and the bytes it was last filled from
+        self._obs_prev_hash_np = np.zeros(32, dtype=np.uint8)
+        self._obs_prev_hash_src = None
+        _log_info("Environment initialized.")
 
     def fix_permutation(self, arr, n):
         """
         Ensure the transaction order is a valid permutation of n elements.
+        Out-of-range and repeated indices are skipped; indices never proposed are appended in
+        ascending order.
         Args:
-            arr (list[int]): Proposed permutation.
+            arr (list[int] | np.ndarray): Proposed permutation.
             n (int): Number of elements.
         Returns:
-            list[int]: Valid permutation of n elements.
-        """
-        seen = set()
-        res = []
-        for x in arr:
-            if x not in seen and 0 <= x < n:
-                res.append(x)
-                seen.add(x)
-        for x in range(n):
-            if x not in seen:
-                res.append(x)
-        return res[:n]
+            np.ndarray: Valid permutation of n elements (never the array passed in).
+        """
+        if n <= _SMALL_PERMUTATION:
+            seen = set()
+            res = []
+            for x in (arr.tolist() if isinstance(arr, np.ndarray) else arr):
+                if x not in seen and 0 <= x < n:
+                    res.append(x)
+                    seen.add(x)
+            res.extend([x for x in range(n) if x not in seen])
+            return np.array(res, dtype=np.int64)
 
-    def step(self, action):
+        arr = np.array(arr, dtype=np.int64)
+        # Already a permutation (e.g. np.random.permutation): nothing to repair
+        if len(arr) == n and (np.sort(arr) == np.arange(n)).all():
+            return arr
+        valid = arr[(arr >= 0) & (arr < n)]
+        # First occurrence of every index, kept in proposal order
+        _, first = np.unique(valid, return_index=True)
+        kept = valid[np.sort(first)]
+        seen = np.zeros(n, dtype=np.uint8)
+        seen[kept] = 1
+        return np.concatenate((kept, np.flatnonzero(seen == 0)))
+
+    def _reset_merkle_cache(self):
         """
-        Take an action in the environment: try to mine a block with the given parameters.
+        Rebuild the cached Merkle tree after self.transactions has changed.
+        """
+        self._merkle_cache = IncrementalMerkle(self.transactions)
+        # Tree shape for reordered blocks depends only on the transaction count (plus coinbase)
+        self._merkle_fn = compile_merkle(self.num_txs + 1)
+        self._identity_order = np.arange(self.num_txs)
+        # Last (extra_nonce, block_height, raw tx_order) and what it produced, see _merkle_for_action
+        self._last_merkle_key = None
+        self._last_raw_order = None
+        self._last_merkle = None
+        _log_debug("Merkle cache rebuilt for %d transactions.", self.num_txs)
+
+    def _normalize_tx_order(self, tx_order):
+        """
+        Repair a proposed transaction order into a permutation of the current transactions.
+        Args:
+            tx_order (list[int] | np.ndarray): Proposed transaction order.
+        Returns:
+            np.ndarray: Valid permutation of the current transactions.
+        """
+        return self.fix_permutation(tx_order, self.num_txs)
+
+    def _build_merkle_root(self, extra_nonce, tx_order):
+        """
+        Build the coinbase transaction and the Merkle root for the current block.
+        Args:
+            extra_nonce (int): Extra nonce for the coinbase transaction.
+            tx_order (np.ndarray): Valid permutation of the non-coinbase transactions.
+        Returns:
+            tuple: (coinbase_tx, full_tx_list, merkle_root)
+        """
+        # Create coinbase transaction and compute its txid
+        _, coinbase_tx = build_coinbase(self.block_height, extra_nonce, miner_msg="Mining with RL")
+
+        coinbase_row = np.frombuffer(coinbase_tx, dtype=np.uint8)
+
+        # Unchanged order: only the coinbase path of the cached tree needs hashing
+        if np.array_equal(tx_order, self._identity_order):
+            full_tx_list = np.vstack((coinbase_row, self.transactions))
+            return coinbase_tx, full_tx_list, self._merkle_cache.root_with_coinbase(coinbase_tx)
+
+        # Reorder transactions (one gather over the rows) and build full transaction list
+        reordered_txs = self.transactions[tx_order]
+        full_tx_list = np.vstack((coinbase_row, reordered_txs))
+        return coinbase_tx, full_tx_list, self._merkle_fn(full_tx_list)
+
+    def _merkle_for_action(self, extra_nonce, raw_order):
+        """
+        Resolve an action's transaction order and Merkle root, reusing the previous result when
+        only the nonce has changed since the last call.
+        Args:
+            extra_nonce (int): Extra nonce for the coinbase transaction.
+            raw_order (list[int] | np.ndarray): Transaction order as proposed by the action.
+        Returns:
+            tuple: (tx_order, coinbase_tx, full_tx_list, merkle_root)
+        """
+        key = (extra_nonce, self.block_height)
+        if key == self._last_merkle_key and np.array_equal(raw_order, self._last_raw_order):
+            return self._last_merkle
+        tx_order = self._normalize_tx_order(raw_order)
+        self._last_merkle = (tx_order,) + self._build_merkle_root(extra_nonce, tx_order)
+        self._last_merkle_key = key
+        # Copied: callers may mutate the array they passed in between steps
+        self._last_raw_order = np.array(raw_order)
+        return self._last_merkle
+
+    def _write_header_static(self, version, prev_hash_le, merkle_le, timestamp, bits):
+        """
+        Set header bytes 0-75 (everything but the nonce) on the hasher.
+        Args:
+            version (int): Block version.
+            prev_hash_le (bytes): Previous block hash (32 bytes, little-endian).
+            merkle_le (bytes): Merkle root (32 bytes, little-endian).
+            timestamp (int): Block timestamp.
+            bits (int): Difficulty bits.
+        """
+        self._hasher.set_prefix(HEADER_PREFIX.pack(version, prev_hash_le, merkle_le, timestamp, bits))
+
+    def _header_prefix(self, merkle_root, timestamp):
+        """
+        Serialize the current block header without its nonce.
+        Args:
+            merkle_root (bytes): Merkle root (32 bytes, little-endian).
+            timestamp (int): Block timestamp.
+        Returns:
+            bytes: First 76 bytes of the serialized header.
+        """
+        return HEADER_PREFIX.pack(self.version, self.previousblockhash, merkle_root, timestamp, self.bits)
+
+    def _attempt(self, action):
+        """
+        Run one mining attempt and apply its state transition, without building obs or info.
         Args:
             action (dict): Contains 'nonce', 'extra_nonce', and 'tx_order'.
         Returns:
-            tuple: (observation, reward, done, info)
+            tuple: (reward, block_hash, prev_hash, merkle_root, coinbase_tx, full_tx_list), where
+                prev_hash is the previous block hash the attempt was mined on.
         """
-        if ENABLE_LOGGING:
-            logger.debug(f"Action received: {action}")
+        # Per-attempt logs sit behind __debug__ as well so that `python -O` strips them from step()
+        if __debug__ and ENABLE_LOGGING:
+            logger.debug("Action received: %s", action)
         nonce = int(action["nonce"])
         extra_nonce = int(action["extra_nonce"])
 
-        tx_order = action["tx_order"].tolist() if isinstance(action["tx_order"], np.ndarray) else action["tx_order"]
-        tx_order = [min(max(0, i), self.num_txs - 1) for i in tx_order]
-        tx_order = self.fix_permutation(tx_order, self.num_txs)
-
         new_timestamp = int(self.base_timestamp)
         if new_timestamp < self.base_timestamp:
             new_timestamp = self.base_timestamp
 
-        # Create coinbase transaction and compute its txid
-        raw_coinbase_tx = create_coinbase_tx(self.block_height, extra_nonce, miner_msg="Mining with RL")
-        coinbase_tx = txid(raw_coinbase_tx)
+        tx_order, coinbase_tx, full_tx_list, new_merkle_root = self._merkle_for_action(extra_nonce, action["tx_order"])
 
-        # Reorder transactions and build full transaction list
-        reordered_txs = [self.transactions[i] for i in tx_order]
-        full_tx_list = [coinbase_tx] + reordered_txs
-        new_merkle_root = merkle_root(full_tx_list)
-
-        # Build block header fields
-        header_fields = {
-            "version": self.version,
-            "previousblockhash": self.previousblockhash,
-            "merkleroot": new_merkle_root,
-            "timestamp": new_timestamp,
-            "bits": self.bits,
-            "nonce": nonce
-        }
-
-        if ENABLE_LOGGING:
-            logger.debug(f"Block header fields: {header_fields}")
-        block_hash = compute_hash(header_fields)
-        hash_int = int(block_hash, 16)
-        if ENABLE_LOGGING:
-            logger.info(f"Block hash: {block_hash}, Target: {self.target}")
-
-        reward = 0
-        done = False
+        prev_hash = self.previousblockhash
+        header_key = (prev_hash, new_merkle_root, new_timestamp)
+        if header_key != self._header_key:
+            self._write_header_static(self.version, prev_hash, new_merkle_root, new_timestamp, self.bits)
+            self._header_key = header_key
+        block_hash = self._hasher.hash_nonce(nonce)
+        if __debug__ and ENABLE_LOGGING:
+            logger.info("Block hash: %s, Target: %s", block_hash_hex(block_hash), self.target)
 
         # Check if the block hash meets the target (valid block)
-        if hash_int < self.target:
+        if block_hash < self.target_be:
             reward = 100
-            self.previousblockhash = block_hash
+            # Stored in header byte order, ready for serialization
+            self.previousblockhash = block_hash[::-1]
             self.block_height += 1
-            if ENABLE_LOGGING:
-                logger.info(f"Valid block found! Height: {self.block_height-1}, Hash: {block_hash}")
+            _log_info("Valid block found! Height: %d, Hash: %s", self.block_height - 1, block_hash_hex(block_hash))
             # Generate new transactions for the next block
             self.transactions = generate_transactions()
             self.num_txs = len(self.transactions)
+            self._reset_merkle_cache()
         else:
-            reward = - (hash_int / 2**256)
-            if ENABLE_LOGGING:
-                logger.debug(f"Invalid block. Hash: {block_hash} >= Target: {self.target}")
+            # The leading 64 bits are plenty of precision for reward shaping
+            reward = - (int.from_bytes(block_hash[:8], 'big') / 2**64)
+            if __debug__ and ENABLE_LOGGING:
+                logger.debug("Invalid block. Hash: %s >= Target: %s", block_hash_hex(block_hash), self.target)
 
         self.current_nonce = nonce
         self.current_timestamp = new_timestamp
         self.current_tx_order = tx_order
+        return reward, block_hash, prev_hash, new_merkle_root, coinbase_tx, full_tx_list
+
+    def step(self, action):
+        """
+        Take an action in the environment: try to mine a block with the given parameters.
+        Args:
+            action (dict): Contains 'nonce', 'extra_nonce', and 'tx_order'.
+        Returns:
+            tuple: (observation, reward, done, info)
+        """
+        reward, block_hash, prev_hash, new_merkle_root, coinbase_tx, full_tx_list = self._attempt(action)
+
+        # Build block header fields (call header_fields._asdict() for a dict view)
+        header_fields = HeaderFields(
+            self.version, prev_hash, new_merkle_root, self.current_timestamp, self.bits, self.current_nonce
+        )
+        if __debug__ and ENABLE_LOGGING:
+            logger.debug("Block header fields: %s", header_fields)
 
+        done = False
         return self._get_obs(), reward, done, {
-            "block_hash": block_hash,
-            "hash_int": hash_int,
+            "block_hash": block_hash_hex(block_hash),
+            "hash_int": int.from_bytes(block_hash, 'big'),
             "target": self.target,
             "header_fields": header_fields,
             "coinbase_tx": coinbase_tx,
             "full_tx_list": full_tx_list
         }
 
+    def step_fast(self, action):
+        """
+        Take an action like step(), but return only the reward and the block hash.
+        Skips building the observation and info dicts; meant for tight nonce-search loops.
+        Args:
+            action (dict): Contains 'nonce', 'extra_nonce', and 'tx_order'.
+        Returns:
+            tuple: (reward, block_hash) with block_hash as 32 bytes, big-endian.
+        """
+        reward, block_hash = self._attempt(action)[:2]
+        return reward, block_hash
+
+    def step_range(self, start_nonce, n, extra_nonce=0, tx_order=None):
+        """
+        Search n consecutive nonces for a valid block in a single call.
+        The coinbase transaction and Merkle root are built once for the whole range and no
+        observations are produced. The environment state is left untouched; pass the returned
+        nonce to step() to claim the block.
+        Args:
+            start_nonce (int): First nonce to try.
+            n (int): Number of nonces to try.
+            extra_nonce (int): Extra nonce for the coinbase transaction.
+            tx_order (list[int] | None): Transaction order (default: current transactions in order).
+        Returns:
+            int | None: First valid nonce in the range, or None if there is none.
+        """
+        header_prefix = self._search_prefix(extra_nonce, tx_order)
+        return search_nonce_range(header_prefix, start_nonce, start_nonce + n, self.target)
+
+    def step_gpu(self, start_nonce, total=2**24, extra_nonce=0, tx_order=None):
+        """
+        Search total consecutive nonces for a valid block on a CUDA device.
+        Same contract as step_range(): the environment state is left untouched and the returned
+        nonce can be passed to step() to claim the block.
+        Args:
+            start_nonce (int): First nonce to try.
+            total (int): Number of nonces to try.
+            extra_nonce (int): Extra nonce for the coinbase transaction.
+            tx_order (list[int] | None): Transaction order (default: current transactions in order).
+        Returns:
+            int | None: First valid nonce in the range, or None if there is none.
+        """
+        if sha256_cuda is None or not sha256_cuda.is_available():
+            raise RuntimeError("step_gpu requires numba and a CUDA device")
+        header_prefix = self._search_prefix(extra_nonce, tx_order)
+        return sha256_cuda.search_nonces_gpu(header_prefix, start_nonce, total, self.target)
+
+    def _search_prefix(self, extra_nonce, tx_order):
+        """
+        Build the 76-byte header prefix searched by step_range() and step_gpu().
+        Args:
+            extra_nonce (int): Extra nonce for the coinbase transaction.
+            tx_order (list[int] | None): Transaction order (default: current transactions in order).
+        Returns:
+            bytes: First 76 bytes of the serialized header.
+        """
+        tx_order = self._normalize_tx_order(tx_order if tx_order is not None else self._identity_order)
+        _, _, new_merkle_root = self._build_merkle_root(extra_nonce, tx_order)
+        return self._header_prefix(new_merkle_root, int(self.base_timestamp))
+
     def reset(self):
         """
         Reset the environment to the initial state for a new episode.
@@ -183,42 +375,45 @@ class SimpleBitcoinEnv(gym.Env):
         """
         self.current_nonce = 0
         self.current_timestamp = self.base_timestamp
-        self.current_tx_order = list(range(self.num_txs))
+        self.current_tx_order = self._identity_order.copy()
         self.block_height = 1
-        self.previousblockhash = "00" * 32
-        if ENABLE_LOGGING:
-            logger.info("Environment reset. Block height set to 1, previousblockhash reset.")
+        self.previousblockhash = PREVIOUS_BLOCK_HASH
+        _log_info("Environment reset. Block height set to 1, previousblockhash reset.")
         return self._get_obs()
 
     def _get_obs(self):
         """
         Construct the current observation for the agent.
+        The previous block hash is given in header byte order (little-endian); its array is reused
+        across steps and updated in place, so copy it to keep a snapshot.
         Returns:
             dict: Observation dictionary.
         """
-        prev_hash_bytes = bytes.fromhex(self.previousblockhash)
+        # The previous hash only changes when a block is found, so its array is refreshed in place
+        if self.previousblockhash is not self._obs_prev_hash_src:
+            self._obs_prev_hash_np[:] = np.frombuffer(self.previousblockhash, dtype=np.uint8)
+            self._obs_prev_hash_src = self.previousblockhash
         obs = {
             "version": self.version,
-            "previousblockhash": np.frombuffer(prev_hash_bytes, dtype=np.uint8),
+            "previousblockhash": self._obs_prev_hash_np,
             "bits": self.bits,
             "timestamp": self.current_timestamp,
             "nonce": self.current_nonce,
             "tx_order": np.array(self.current_tx_order)
         }
-        if ENABLE_LOGGING:
-            logger.debug(f"Observation: {obs}")
+        if __debug__ and ENABLE_LOGGING:
+            logger.debug("Observation: %s", obs)
         return obs
 
     def render(self, mode='human'):
         """
         Print the current block header and environment state to the log (if enabled).
         """
-        if ENABLE_LOGGING:
-            logger.info("Current Block Header:")
-            logger.info(f"  Version: {self.version}")
-            logger.info(f"  Previous Block Hash: {self.previousblockhash}")
-            logger.info(f"  Bits (difficulty): {hex(self.bits)}")
-            logger.info(f"  Timestamp: {self.current_timestamp}")
-            logger.info(f"  Nonce: {self.current_nonce}")
-            logger.info(f"  Transaction order (non-coinbase): {self.current_tx_order}")
-            logger.info(f"  Block height: {self.block_height}") 
\ No newline at end of file
+        _log_info("Current Block Header:")
+        _log_info("  Version: %s", self.version)
+        _log_info("  Previous Block Hash: %s", block_hash_hex(self.previousblockhash[::-1]))
+        _log_info("  Bits (difficulty): %#x", self.bits)
+        _log_info("  Timestamp: %s", self.current_timestamp)
+        _log_info("  Nonce: %s", self.current_nonce)
+        _log_info("  Transaction order (non-coinbase): %s", self.current_tx_order)
+        _log_info("  Block height: %s", self.block_height) 
\ No newline at end of file
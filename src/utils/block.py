@@ -2,10 +2,30 @@
 Block utility functions for Bitcoin-like block construction and hashing.
 Includes serialization, coinbase transaction creation, and hash utilities.
 """
+import functools
 import hashlib
 import struct
+from typing import NamedTuple
 import base58
 
+# Fixed parts of the coinbase transaction around the variable scriptSig and scriptPubKey
+_COINBASE_HEAD = (
+    struct.pack("<I", 1)                   # version
+    + b'\x01'                              # tx_in count
+    + b'\x00' * 32                         # prev_out hash
+    + b'\xff\xff\xff\xff'                  # prev_out index
+)
+_COINBASE_MID = (
+    b'\xff\xff\xff\xff'                    # sequence
+    + b'\x01'                              # tx_out count
+    + struct.pack("<Q", 50 * 100_000_000)  # value
+)
+_COINBASE_LOCK_TIME = b'\x00\x00\x00\x00'
+
+# Block header layout: bytes 0-75 (version, previous hash, Merkle root, timestamp, bits), then the nonce
+HEADER_PREFIX = struct.Struct("<L32s32sLL")
+_HEADER = struct.Struct(HEADER_PREFIX.format + "L")
+
 def encode_varint(i):
     """
     Encode an integer as a Bitcoin-style variable-length integer.
@@ -44,9 +64,10 @@ def encode_script_num(num):
         result[-1] |= 0x80
     return bytes(result)
 
+@functools.lru_cache(maxsize=16)
 def address_to_script_pubkey(address: str) -> bytes:
     """
-    Convert a Base58Check Bitcoin address to a P2PKH scriptPubKey.
+    Convert a Base58Check Bitcoin address to a P2PKH scriptPubKey (memoized per address).
     Args:
         address (str): Base58Check Bitcoin address.
     Returns:
@@ -68,40 +89,48 @@ def create_coinbase_tx(block_height: int, extra_nonce: int, miner_msg: str = "",
     Returns:
         bytes: Raw serialized coinbase transaction.
     """
-    version = struct.pack("<I", 1)
-    tx_in_count = b'\x01'
-    prev_out_hash = b'\x00' * 32
-    prev_out_index = b'\xff\xff\xff\xff'
     height_bytes = encode_script_num(block_height)
-    height_push = bytes([len(height_bytes)]) + height_bytes
-    extra_data = struct.pack("<I", extra_nonce) + miner_msg.encode()
-    script_sig = height_push + extra_data
-    script_sig_len = encode_varint(len(script_sig))
-    sequence = b'\xff\xff\xff\xff'
-    tx_in = prev_out_hash + prev_out_index + script_sig_len + script_sig + sequence
-    tx_out_count = b'\x01'
-    value = struct.pack("<Q", 50 * 100_000_000)
+    script_sig = bytes([len(height_bytes)]) + height_bytes + struct.pack("<I", extra_nonce) + miner_msg.encode()
     script_pubkey = address_to_script_pubkey(address) # not valid wallet address check P2PKH (Pay-to-PubKey-Hash) 
-    script_pubkey_len = encode_varint(len(script_pubkey))
-    tx_out = value + script_pubkey_len + script_pubkey
-    lock_time = b'\x00\x00\x00\x00'
-    raw_tx = version + tx_in_count + tx_in + tx_out_count + tx_out + lock_time
-    return raw_tx
+    return b''.join((
+        _COINBASE_HEAD,
+        encode_varint(len(script_sig)), script_sig,
+        _COINBASE_MID,
+        encode_varint(len(script_pubkey)), script_pubkey,
+        _COINBASE_LOCK_TIME,
+    ))
 
-def txid(tx_bytes: bytes) -> str:
+@functools.lru_cache(maxsize=8)
+def build_coinbase(block_height: int, extra_nonce: int, miner_msg: str = "", address: str = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"):
+    """
+    Build a coinbase transaction together with its txid.
+    Memoized: while mining a block the height and message are fixed and the extra nonce rarely
+    changes, so the coinbase work runs once per (height, extra_nonce) instead of every step.
+    Args:
+        block_height (int): Height of the block (for BIP34).
+        extra_nonce (int): Extra nonce for uniqueness.
+        miner_msg (str): Optional miner message for scriptSig.
+        address (str): Base58Check address paid by the coinbase output.
+    Returns:
+        tuple: (raw_tx, txid) as bytes.
+    """
+    raw_tx = create_coinbase_tx(block_height, extra_nonce, miner_msg, address)
+    return raw_tx, txid(raw_tx)
+
+def txid(tx_bytes: bytes) -> bytes:
     """
     Compute the transaction ID (txid) as a double SHA256 hash of the transaction bytes.
     Args:
         tx_bytes (bytes): Raw transaction bytes.
     Returns:
-        str: Transaction ID as a hex string (big-endian).
+        bytes: Transaction ID (big-endian).
     """
-    tx_hash = hashlib.sha256(hashlib.sha256(tx_bytes).digest()).digest()[::-1].hex()
-    return tx_hash
+    return hashlib.sha256(hashlib.sha256(tx_bytes).digest()).digest()[::-1]
 
+@functools.lru_cache(maxsize=64)
 def bits_to_target(bits):
     """
-    Convert compact difficulty bits to a target integer.
+    Convert compact difficulty bits to a target integer (memoized per bits value).
     Args:
         bits (int): Compact representation of target.
     Returns:
@@ -112,27 +141,32 @@ def bits_to_target(bits):
     target = mantissa * (1 << (8 * (exponent - 3)))
     return target
 
+class HeaderFields(NamedTuple):
+    """
+    Block header fields in serialization order.
+    Hashes are 32 bytes in header byte order (little-endian).
+    """
+    version: int
+    prev: bytes
+    merkle: bytes
+    ts: int
+    bits: int
+    nonce: int
+
 def serialize_block_header(version, prev_hash, merkle_root, timestamp, bits, nonce):
     """
     Serialize block header fields into a 80-byte header.
     Args:
         version (int): Block version.
-        prev_hash (str): Previous block hash (hex string).
-        merkle_root (str): Merkle root (hex string).
+        prev_hash (bytes): Previous block hash (32 bytes, little-endian).
+        merkle_root (bytes): Merkle root (32 bytes, little-endian).
         timestamp (int): Block timestamp.
         bits (int): Difficulty bits.
         nonce (int): Nonce value.
     Returns:
         bytes: Serialized block header.
     """
-    header = b''
-    header += struct.pack("<L", version)
-    header += bytes.fromhex(prev_hash)[::-1]
-    header += bytes.fromhex(merkle_root)[::-1]
-    header += struct.pack("<L", timestamp)
-    header += struct.pack("<L", bits)
-    header += struct.pack("<L", nonce)
-    return header
+    return _HEADER.pack(version, prev_hash, merkle_root, timestamp, bits, nonce)
 
 def double_sha256(data):
     """
@@ -144,21 +178,69 @@ def double_sha256(data):
     """
     return hashlib.sha256(hashlib.sha256(data).digest()).digest()
 
-def compute_hash(header_fields):
+def compute_hash(header: HeaderFields):
     """
     Compute the block hash from header fields.
     Args:
-        header_fields (dict): Block header fields.
+        header (HeaderFields): Block header fields.
+    Returns:
+        bytes: Block hash (32 bytes, big-endian).
+    """
+    return double_sha256(serialize_block_header(*header))[::-1]
+
+def block_hash_hex(block_hash: bytes) -> str:
+    """
+    Format a block hash for logging and display.
+    Args:
+        block_hash (bytes): Block hash (32 bytes, big-endian).
     Returns:
         str: Block hash as a hex string (big-endian).
     """
-    serialized = serialize_block_header(
-        header_fields['version'],
-        header_fields['previousblockhash'],
-        header_fields['merkleroot'],
-        header_fields['timestamp'],
-        header_fields['bits'],
-        header_fields['nonce']
-    )
-    hash_val = double_sha256(serialized)[::-1].hex()
-    return hash_val 
\ No newline at end of file
+    return block_hash.hex()
+
+class HeaderHasher:
+    """
+    Double SHA256 of a block header where only the nonce changes between most calls.
+    The first 64 bytes of the header (version, previous hash and most of the Merkle root) fill
+    exactly one SHA256 block, so its state (the midstate) is computed once and every nonce only
+    compresses the 16-byte tail plus the second SHA256. set_prefix() keeps the midstate when
+    only bytes 64-75 change (timestamp, bits); a new Merkle root almost always changes bytes
+    32-63 and needs a new midstate.
+    """
+    def __init__(self, header_prefix: bytes):
+        """
+        Args:
+            header_prefix (bytes): First 76 bytes of the serialized header (everything but the nonce).
+        """
+        self.midstate = None
+        self.tail = bytearray(16)
+        self._prefix64 = None
+        self.set_prefix(header_prefix)
+
+    def set_prefix(self, header_prefix: bytes):
+        """
+        Replace the header bytes hashed before the nonce, recomputing the midstate only if
+        bytes 0-63 changed.
+        Args:
+            header_prefix (bytes): First 76 bytes of the serialized header (everything but the nonce).
+        """
+        if len(header_prefix) != HEADER_PREFIX.size:
+            raise ValueError("Header prefix must be 76 bytes")
+        prefix64 = header_prefix[:64]
+        if prefix64 != self._prefix64:
+            self.midstate = hashlib.sha256(prefix64)
+            self._prefix64 = prefix64
+        self.tail[:12] = header_prefix[64:]
+
+    def hash_nonce(self, nonce: int) -> bytes:
+        """
+        Compute the block hash for the given nonce.
+        Args:
+            nonce (int): Nonce value.
+        Returns:
+            bytes: Block hash (32 bytes, big-endian).
+        """
+        struct.pack_into("<L", self.tail, 12, nonce)
+        ctx = self.midstate.copy()
+        ctx.update(self.tail)
+        return hashlib.sha256(ctx.digest()).digest()[::-1]
@@ -1,7 +1,21 @@
 """
 Merkle tree utilities for computing the Merkle root of a list of transaction hashes.
+Each tree level is hashed in one batched call, using the parallel Numba kernel for large levels
+when numba is installed and has more than one thread.
 """
+import functools
 import hashlib
+import numpy as np
+
+try:
+    from numba import get_num_threads
+    from src.utils.sha256_numba import double_sha256_64_rows
+except ImportError:  # numba is optional
+    double_sha256_64_rows = None
+
+# Smallest level sent to the Numba kernel. Per row it is slower than hashlib on one thread, so it
+# only wins once the rows are split over several threads and cover the parallel launch.
+NUMBA_MIN_ROWS = 128
 
 def double_sha256(data: bytes) -> bytes:
     """
@@ -13,23 +27,112 @@ def double_sha256(data: bytes) -> bytes:
     """
     return hashlib.sha256(hashlib.sha256(data).digest()).digest()
 
+def _hash_rows(pairs):
+    """
+    Double SHA256 every row of a contiguous (k, 64) buffer of concatenated node pairs.
+    Args:
+        pairs (np.ndarray): (k, 64) uint8 array.
+    Returns:
+        np.ndarray: (k, 32) uint8 array of parent hashes.
+    """
+    if double_sha256_64_rows is not None and len(pairs) >= NUMBA_MIN_ROWS and get_num_threads() > 1:
+        return double_sha256_64_rows(pairs)
+    parents = b"".join([double_sha256(row) for row in pairs])
+    return np.frombuffer(parents, dtype=np.uint8).reshape(-1, 32)
+
+def _hash_pairs(level):
+    """
+    Hash adjacent rows of an even-length level into the next level of the tree.
+    The level is viewed as one contiguous (k, 64) buffer and hashed in a single batched call.
+    Args:
+        level (np.ndarray): (2k, 32) uint8 array of node hashes.
+    Returns:
+        np.ndarray: (k, 32) uint8 array of parent hashes.
+    """
+    return _hash_rows(np.ascontiguousarray(level).reshape(-1, 64))
+
 def merkle_root(tx_hashes):
     """
     Compute the Merkle root of a list of transaction hashes.
     Args:
-        tx_hashes (list[str]): List of transaction hashes as hex strings.
+        tx_hashes (np.ndarray | list[bytes]): (num_txs, 32) uint8 array or list of 32-byte
+            transaction hashes.
     Returns:
-        str: Merkle root as a hex string (big-endian).
+        bytes: Merkle root in header byte order (little-endian).
     """
     if len(tx_hashes) == 0:
-        return '00' * 32
-    hashes = [bytes.fromhex(h) for h in tx_hashes]
-    while len(hashes) > 1:
-        if len(hashes) % 2 != 0:
-            hashes.append(hashes[-1])
-        new_hashes = []
-        for i in range(0, len(hashes), 2):
-            new_hashes.append(double_sha256(hashes[i] + hashes[i+1]))
-        hashes = new_hashes
-    merkle = hashes[0][::-1].hex()
-    return merkle 
\ No newline at end of file
+        return bytes(32)
+    if isinstance(tx_hashes, np.ndarray):
+        level = np.ascontiguousarray(tx_hashes, dtype=np.uint8)
+    else:
+        level = np.frombuffer(b"".join(tx_hashes), dtype=np.uint8).reshape(-1, 32)
+    while len(level) > 1:
+        if len(level) % 2 != 0:
+            level = np.vstack((level, level[-1:]))
+        level = _hash_pairs(level)
+    return level[0].tobytes()
+
+@functools.lru_cache(maxsize=32)
+def compile_merkle(n):
+    """
+    Generate a Merkle root function specialized for exactly n transaction hashes.
+    The level sizes and the levels that duplicate their last node follow from n alone, so the
+    generated function is straight-line code with literal sizes and one batched hash per level.
+    Args:
+        n (int): Number of transaction hashes, coinbase included.
+    Returns:
+        Callable[[np.ndarray], bytes]: Maps an (n, 32) uint8 array to the Merkle root in header
+            byte order (little-endian).
+    """
+    lines = [f"def merkle_root_{n}(tx_hashes):"]
+    if n == 0:
+        lines.append("    return bytes(32)")
+    else:
+        lines.append("    level = np.ascontiguousarray(tx_hashes, dtype=np.uint8)")
+        size = n
+        while size > 1:
+            if size % 2 != 0:
+                lines.append("    level = np.concatenate((level, level[-1:]))")
+                size += 1
+            size //= 2
+            lines.append(f"    level = _hash_rows(level.reshape({size}, 64))")
+        lines.append("    return level[0].tobytes()")
+    namespace = {"np": np, "_hash_rows": _hash_rows}
+    exec("\n".join(lines), namespace)
+    return namespace[f"merkle_root_{n}"]
+
+class IncrementalMerkle:
+    """
+    Merkle tree over a fixed set of non-coinbase transactions with a changing coinbase.
+    The coinbase is always leaf 0, so only the leftmost path of the tree depends on it. Every
+    level is hashed once with a placeholder coinbase and only the right sibling of the leftmost
+    node is kept per level; a new coinbase then costs one double SHA256 per level.
+    """
+    def __init__(self, tx_hashes):
+        """
+        Args:
+            tx_hashes (np.ndarray): (num_txs, 32) uint8 array of non-coinbase transaction hashes,
+                in block order.
+        """
+        placeholder = np.zeros((1, 32), dtype=np.uint8)
+        level = np.vstack((placeholder, tx_hashes))
+        self.siblings = []
+        while len(level) > 1:
+            if len(level) % 2 != 0:
+                level = np.vstack((level, level[-1:]))
+            self.siblings.append(level[1].tobytes())
+            # Row 0 stays a placeholder: it is the only node that depends on the coinbase
+            level = np.vstack((placeholder, _hash_pairs(level[2:])))
+
+    def root_with_coinbase(self, coinbase_hash):
+        """
+        Compute the Merkle root for the cached transactions preceded by the given coinbase.
+        Args:
+            coinbase_hash (bytes): 32-byte coinbase transaction hash.
+        Returns:
+            bytes: Merkle root in header byte order (little-endian).
+        """
+        node = coinbase_hash
+        for sibling in self.siblings:
+            node = double_sha256(node + sibling)
+        return node
@@ -0,0 +1,53 @@
+"""
+Nonce search kernel for Bitcoin-like block headers.
+Scans a range of nonces over a fixed 76-byte header prefix and reports the first one whose
+block hash meets the target. Uses the Numba kernel when numba is installed, hashlib otherwise.
+"""
+import hashlib
+import struct
+from typing import Optional
+import numpy as np
+
+try:
+    from src.utils.sha256_numba import search_nonces
+except ImportError:  # numba is optional
+    search_nonces = None
+
+# Nonces per Numba call; bounds the per-call hit buffer and the work done past the first hit
+NUMBA_CHUNK = 1 << 16
+
+def search_nonce_range(header_prefix76: bytes, start: int, end: int, target: int) -> Optional[int]:
+    """
+    Find the first nonce in [start, end) whose double SHA256 block hash is below the target.
+    The prefix is hashed once; each nonce only appends its 4 bytes to a copy of that state.
+    Args:
+        header_prefix76 (bytes): Serialized header without the nonce (76 bytes).
+        start (int): First nonce to try.
+        end (int): End of the nonce range (exclusive, clamped to 2**32).
+        target (int): Target integer the block hash must be below.
+    Returns:
+        Optional[int]: Winning nonce, or None if no nonce in the range meets the target.
+    """
+    if len(header_prefix76) != 76:
+        raise ValueError("Header prefix must be 76 bytes")
+    start = max(0, start)
+    end = min(end, 2**32)
+    target_be = target.to_bytes(32, 'big')
+    if search_nonces is not None:
+        prefix = np.frombuffer(header_prefix76, dtype=np.uint8)
+        target_arr = np.frombuffer(target_be, dtype=np.uint8)
+        for chunk_start in range(start, end, NUMBA_CHUNK):
+            nonce = search_nonces(prefix, chunk_start, min(NUMBA_CHUNK, end - chunk_start), target_arr)
+            if nonce >= 0:
+                return int(nonce)
+        return None
+
+    prefix_ctx = hashlib.sha256(header_prefix76)
+    sha256 = hashlib.sha256
+    pack_nonce = struct.Struct("<L").pack
+    for nonce in range(start, end):
+        ctx = prefix_ctx.copy()
+        ctx.update(pack_nonce(nonce))
+        if sha256(ctx.digest()).digest()[::-1] < target_be:
+            return nonce
+    return None
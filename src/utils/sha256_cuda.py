@@ -0,0 +1,119 @@
+"""
+CUDA nonce search for block headers using Numba.
+Each thread tests one nonce: it finishes the first SHA256 from the header midstate with its own
+16-byte tail, runs the second SHA256, and compares the block hash with the target. The lowest
+winning nonce of a launch is recorded with an atomic min.
+The SHA256 round function is compiled from the same source as sha256_numba, with int64 arithmetic
+masked to 32 bits.
+"""
+from typing import Optional
+import numpy as np
+from numba import cuda, int64
+
+from src.utils.sha256_numba import _H0, _MASK32, _sha256_core, header_midstate
+
+BLOCKS = 4096
+THREADS_PER_BLOCK = 256
+NONCES_PER_LAUNCH = BLOCKS * THREADS_PER_BLOCK  # 2**20
+
+_NOT_FOUND = np.iinfo(np.int64).max
+
+def is_available() -> bool:
+    """
+    Check whether a CUDA device can be used.
+    Returns:
+        bool: True if Numba can see a CUDA device.
+    """
+    return cuda.is_available()
+
+# Same round function as the CPU kernel, compiled as device functions
+_rotr, _compress = _sha256_core(cuda.jit(device=True))
+
+@cuda.jit
+def kernel_search(midstate, tail_prefix12, start_nonce, count, target_be, out_found):
+    """
+    Test nonces start_nonce .. start_nonce + count - 1, one per thread.
+    Args:
+        midstate (np.ndarray): int64[8] SHA256 state after the first 64 header bytes.
+        tail_prefix12 (np.ndarray): uint8[12] header bytes 64-75 (end of Merkle root, timestamp, bits).
+        start_nonce (int): Nonce tested by thread 0.
+        count (int): Number of nonces in this launch.
+        target_be (np.ndarray): uint8[32] target as big-endian bytes.
+        out_found (np.ndarray): int64[1], lowered with atomic min to the smallest winning nonce.
+    """
+    i = cuda.grid(1)
+    if i >= count:
+        return
+    nonce = start_nonce + i
+    if nonce > _MASK32:
+        return
+
+    w = cuda.local.array(64, int64)
+    state = cuda.local.array(8, int64)
+
+    # First SHA256, second block: 16 header bytes, 0x80 padding and a 640-bit length
+    for j in range(3):
+        w[j] = ((int64(tail_prefix12[4 * j]) << 24) | (int64(tail_prefix12[4 * j + 1]) << 16)
+                | (int64(tail_prefix12[4 * j + 2]) << 8) | int64(tail_prefix12[4 * j + 3]))
+    # The nonce is serialized little-endian, so its bytes are swapped within the word
+    w[3] = (((nonce & 0xff) << 24) | (((nonce >> 8) & 0xff) << 16)
+            | (((nonce >> 16) & 0xff) << 8) | ((nonce >> 24) & 0xff))
+    w[4] = 0x80000000
+    for j in range(5, 15):
+        w[j] = 0
+    w[15] = 640
+    for j in range(8):
+        state[j] = midstate[j]
+    _compress(state, w)
+
+    # Second SHA256 over the 32-byte digest, whose big-endian words are the state words
+    for j in range(8):
+        w[j] = state[j]
+    w[8] = 0x80000000
+    for j in range(9, 15):
+        w[j] = 0
+    w[15] = 256
+    for j in range(8):
+        state[j] = _H0[j]
+    _compress(state, w)
+
+    # The block hash is the digest reversed: its byte i is digest byte 31 - i
+    for j in range(32):
+        k = 31 - j
+        byte = (state[k // 4] >> (24 - 8 * (k % 4))) & 0xff
+        if byte != target_be[j]:
+            if byte < target_be[j]:
+                cuda.atomic.min(out_found, 0, nonce)
+            return
+
+def search_nonces_gpu(header_prefix76: bytes, start: int, total: int, target: int) -> Optional[int]:
+    """
+    Find the first nonce in [start, start + total) whose block hash is below the target, on the GPU.
+    Nonces are tested in launches of NONCES_PER_LAUNCH; the search stops after the first launch
+    that reports a hit.
+    Args:
+        header_prefix76 (bytes): Serialized header without the nonce (76 bytes).
+        start (int): First nonce to try.
+        total (int): Number of nonces to try.
+        target (int): Target integer the block hash must be below.
+    Returns:
+        Optional[int]: Winning nonce, or None if no nonce in the range meets the target.
+    """
+    if len(header_prefix76) != 76:
+        raise ValueError("Header prefix must be 76 bytes")
+    prefix = np.frombuffer(header_prefix76, dtype=np.uint8)
+    d_midstate = cuda.to_device(header_midstate(prefix[:64]).astype(np.int64))
+    d_tail = cuda.to_device(prefix[64:].copy())
+    d_target = cuda.to_device(np.frombuffer(target.to_bytes(32, 'big'), dtype=np.uint8).copy())
+    d_found = cuda.to_device(np.array([_NOT_FOUND], dtype=np.int64))
+
+    # Clamped like search_nonce_range: a negative start shortens the range, it does not shift it
+    end = min(start + total, 2**32)
+    start = max(0, start)
+    for launch_start in range(start, end, NONCES_PER_LAUNCH):
+        count = min(NONCES_PER_LAUNCH, end - launch_start)
+        kernel_search[BLOCKS, THREADS_PER_BLOCK](d_midstate, d_tail, launch_start, count, d_target, d_found)
+        found = int(d_found.copy_to_host()[0])
+        if found != _NOT_FOUND:
+            return found
+    return None
@@ -0,0 +1,271 @@
+"""
+Numba-compiled SHA256 for block header hashing.
+Implements the SHA256 compression function over uint8 buffers and uint32 states, a double SHA256
+of an 80-byte header, and a parallel nonce search that reuses the header midstate.
+Arithmetic is done in int64 and masked to 32 bits to avoid Numba's mixed signed/unsigned promotion.
+"""
+import numpy as np
+from numba import njit, prange, get_num_threads
+
+_MASK32 = 0xffffffff
+
+_K = np.array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+], dtype=np.int64)
+
+_H0 = np.array([
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+], dtype=np.uint32)
+
+def _sha256_core(jit):
+    """
+    Compile the SHA256 round function with the given Numba decorator.
+    This module builds it with njit and sha256_cuda with cuda.jit(device=True), so both backends
+    run the same source.
+    Args:
+        jit (Callable): Numba decorator for the target.
+    Returns:
+        tuple: (rotr, compress_words) compiled for that target.
+    """
+    @jit
+    def rotr(x, n):
+        """
+        Rotate a 32-bit word right by n bits.
+        """
+        return ((x >> n) | (x << (32 - n))) & _MASK32
+
+    @jit
+    def compress_words(state, w):
+        """
+        SHA256 compression of the message words w[0:16] into state (uint32[8] or int64[8], updated
+        in place). w is an int64[64] buffer; words 16-63 are expanded in place.
+        """
+        for t in range(16, 64):
+            s0 = rotr(w[t - 15], 7) ^ rotr(w[t - 15], 18) ^ (w[t - 15] >> 3)
+            s1 = rotr(w[t - 2], 17) ^ rotr(w[t - 2], 19) ^ (w[t - 2] >> 10)
+            w[t] = (w[t - 16] + s0 + w[t - 7] + s1) & _MASK32
+
+        a = np.int64(state[0])
+        b = np.int64(state[1])
+        c = np.int64(state[2])
+        d = np.int64(state[3])
+        e = np.int64(state[4])
+        f = np.int64(state[5])
+        g = np.int64(state[6])
+        h = np.int64(state[7])
+        for t in range(64):
+            s1 = rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25)
+            ch = (e & f) ^ ((e ^ _MASK32) & g)
+            t1 = (h + s1 + ch + _K[t] + w[t]) & _MASK32
+            s0 = rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22)
+            maj = (a & b) ^ (a & c) ^ (b & c)
+            t2 = (s0 + maj) & _MASK32
+            h = g
+            g = f
+            f = e
+            e = (d + t1) & _MASK32
+            d = c
+            c = b
+            b = a
+            a = (t1 + t2) & _MASK32
+
+        state[0] = (np.int64(state[0]) + a) & _MASK32
+        state[1] = (np.int64(state[1]) + b) & _MASK32
+        state[2] = (np.int64(state[2]) + c) & _MASK32
+        state[3] = (np.int64(state[3]) + d) & _MASK32
+        state[4] = (np.int64(state[4]) + e) & _MASK32
+        state[5] = (np.int64(state[5]) + f) & _MASK32
+        state[6] = (np.int64(state[6]) + g) & _MASK32
+        state[7] = (np.int64(state[7]) + h) & _MASK32
+
+    return rotr, compress_words
+
+_rotr, _compress_words = _sha256_core(njit(cache=True))
+
+@njit(cache=True)
+def sha256_block(state, block):
+    """
+    Apply the SHA256 compression function to one 64-byte block.
+    Args:
+        state (np.ndarray): uint32[8] hash state, updated in place.
+        block (np.ndarray): uint8[64] message block.
+    """
+    _compress(state, block, np.empty(64, dtype=np.int64))
+
+@njit(cache=True)
+def _compress(state, block, w):
+    """
+    SHA256 compression using a caller-provided int64[64] message schedule buffer.
+    """
+    for t in range(16):
+        w[t] = ((np.int64(block[4 * t]) << 24) | (np.int64(block[4 * t + 1]) << 16)
+                | (np.int64(block[4 * t + 2]) << 8) | np.int64(block[4 * t + 3]))
+    _compress_words(state, w)
+
+@njit(cache=True)
+def _write_digest(state, out):
+    """
+    Write a uint32[8] hash state into out[:32] as big-endian bytes.
+    """
+    for i in range(8):
+        word = np.int64(state[i])
+        out[4 * i] = (word >> 24) & 0xff
+        out[4 * i + 1] = (word >> 16) & 0xff
+        out[4 * i + 2] = (word >> 8) & 0xff
+        out[4 * i + 3] = word & 0xff
+
+@njit(cache=True)
+def _pad_digest_block(block):
+    """
+    Lay out the padding for hashing a 32-byte digest: 0x80 after it and a 256-bit length.
+    The digest itself is written into block[:32] by _write_digest.
+    """
+    block[32:] = 0
+    block[32] = 0x80
+    block[62] = 0x01
+
+@njit(cache=True)
+def _sha256_of_digest(state, out):
+    """
+    Compute SHA256 of the 32-byte digest held in state (the second half of a double SHA256).
+    Args:
+        state (np.ndarray): uint32[8] state of the first SHA256.
+        out (np.ndarray): uint8[32] buffer receiving the final digest.
+    """
+    block = np.empty(64, dtype=np.uint8)
+    _pad_digest_block(block)
+    _write_digest(state, block)
+    second = _H0.copy()
+    sha256_block(second, block)
+    _write_digest(second, out)
+
+@njit(cache=True)
+def double_sha256_80(header):
+    """
+    Compute SHA256(SHA256(header)) of an 80-byte block header.
+    Args:
+        header (np.ndarray): uint8[80] serialized header.
+    Returns:
+        np.ndarray: uint8[32] digest (raw byte order, not reversed).
+    """
+    buf = np.zeros(128, dtype=np.uint8)
+    buf[:80] = header
+    buf[80] = 0x80
+    # Message length: 640 bits
+    buf[126] = 0x02
+    buf[127] = 0x80
+    state = _H0.copy()
+    sha256_block(state, buf[:64])
+    sha256_block(state, buf[64:])
+    out = np.empty(32, dtype=np.uint8)
+    _sha256_of_digest(state, out)
+    return out
+
+@njit(cache=True)
+def header_midstate(prefix64):
+    """
+    Compute the SHA256 state after the first 64 bytes of a header.
+    Args:
+        prefix64 (np.ndarray): uint8[64] first block of the header.
+    Returns:
+        np.ndarray: uint32[8] midstate.
+    """
+    state = _H0.copy()
+    sha256_block(state, prefix64)
+    return state
+
+@njit(cache=True)
+def _below_target(digest, target_be):
+    """
+    Check whether a raw digest, read as a big-endian block hash, is below the target.
+    The block hash is the digest reversed, so digest[31] is its most significant byte.
+    """
+    for i in range(32):
+        byte = digest[31 - i]
+        if byte != target_be[i]:
+            return byte < target_be[i]
+    return False
+
+# Not cached: get_num_threads() is a dynamic global that Numba cannot persist
+@njit(parallel=True)
+def search_nonces(prefix76, start, count, target_be):
+    """
+    Test count consecutive nonces in parallel and return the first one below the target.
+    The range is split into one contiguous slice per thread; each thread reuses its buffers and
+    stops at its first hit, and the lowest hit across threads is the answer.
+    Args:
+        prefix76 (np.ndarray): uint8[76] serialized header without the nonce.
+        start (int): First nonce to try.
+        count (int): Number of nonces to try.
+        target_be (np.ndarray): uint8[32] target as big-endian bytes.
+    Returns:
+        int: Winning nonce, or -1 if no nonce in the range meets the target.
+    """
+    midstate = header_midstate(prefix76[:64])
+    n_slices = get_num_threads()
+    per_slice = (count + n_slices - 1) // n_slices
+    hits = np.full(n_slices, -1, dtype=np.int64)
+    for s in prange(n_slices):
+        w = np.empty(64, dtype=np.int64)
+        state = np.empty(8, dtype=np.uint32)
+        tail = np.zeros(64, dtype=np.uint8)
+        tail[:12] = prefix76[64:76]
+        tail[16] = 0x80
+        # Message length: 640 bits
+        tail[62] = 0x02
+        tail[63] = 0x80
+        second = np.empty(64, dtype=np.uint8)
+        _pad_digest_block(second)
+        digest = np.empty(32, dtype=np.uint8)
+        for i in range(s * per_slice, min(count, (s + 1) * per_slice)):
+            nonce = start + i
+            tail[12] = nonce & 0xff
+            tail[13] = (nonce >> 8) & 0xff
+            tail[14] = (nonce >> 16) & 0xff
+            tail[15] = (nonce >> 24) & 0xff
+            state[:] = midstate
+            _compress(state, tail, w)
+            _write_digest(state, second)
+            state[:] = _H0
+            _compress(state, second, w)
+            _write_digest(state, digest)
+            if _below_target(digest, target_be):
+                hits[s] = nonce
+                break
+    for s in range(n_slices):
+        if hits[s] >= 0:
+            return hits[s]
+    return -1
+
+@njit(parallel=True, cache=True)
+def double_sha256_64_rows(rows):
+    """
+    Compute SHA256(SHA256(row)) for every 64-byte row, e.g. a level of concatenated Merkle node pairs.
+    Args:
+        rows (np.ndarray): (k, 64) uint8 array of messages.
+    Returns:
+        np.ndarray: (k, 32) uint8 array of digests (raw byte order, not reversed).
+    """
+    out = np.empty((rows.shape[0], 32), dtype=np.uint8)
+    for i in prange(rows.shape[0]):
+        w = np.empty(64, dtype=np.int64)
+        state = _H0.copy()
+        _compress(state, rows[i], w)
+        # Padding block for a 64-byte message: 0x80 and a 512-bit length
+        block = np.zeros(64, dtype=np.uint8)
+        block[0] = 0x80
+        block[62] = 0x02
+        _compress(state, block, w)
+        _pad_digest_block(block)
+        _write_digest(state, block)
+        state[:] = _H0
+        _compress(state, block, w)
+        _write_digest(state, out[i])
+    return out
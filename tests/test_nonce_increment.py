@@ -1,4 +1,5 @@
 from src.environments.simple_bitcoin_env import SimpleBitcoinEnv
+from src.utils.block import block_hash_hex
 import numpy as np
 
 NUM_BLOCKS_TO_FIND = 3  # Set how many valid blocks to find before stopping
@@ -20,22 +21,22 @@ if __name__ == "__main__":
                 "extra_nonce": extra_nonce,
                 "tx_order": tx_order
             }
-            obs, reward, done, info = env.step(action)
+            reward, block_hash = env.step_fast(action)
             total_steps += 1
 
             if total_steps % 10000 == 0:
-                print(f"Step {total_steps}: Nonce {nonce}, Hash {info['block_hash']} Reward: {reward}")
+                print(f"Step {total_steps}: Nonce {nonce}, Hash {block_hash_hex(block_hash)} Reward: {reward}")
 
             if reward > 0:
                 blocks_found += 1
                 print(f"✅ Valid block #{blocks_found} found after {total_steps} steps!")
                 print(f"Nonce: {nonce}")
-                print(f"Block Hash: {info['block_hash']}")
-                print(f"Block Header Fields: {info['header_fields']}")
+                print(f"Block Hash: {block_hash_hex(block_hash)}")
+                print(f"Block Height: {env.block_height - 1}")
                 #obs = env.reset()
                 break
         else:
             print("No valid hash found in nonce range for this block.")
             obs = env.reset()
 
-    print(f"Finished! Found {blocks_found} valid blocks in {total_steps} total steps.") 
+    print(f"Finished! Found {blocks_found} valid blocks in {total_steps} total steps.")
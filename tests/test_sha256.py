@@ -0,0 +1,86 @@
+import hashlib
+import os
+import numpy as np
+from src.utils import miner_kernel
+from src.utils.merkle import merkle_root, compile_merkle, IncrementalMerkle
+
+try:
+    from src.utils import sha256_numba
+except ImportError:  # numba is optional
+    sha256_numba = None
+try:
+    from src.utils import sha256_cuda
+except ImportError:
+    sha256_cuda = None
+
+NUM_SAMPLES = 50
+MAX_TXS = 17  # Merkle checks cover every transaction count from 1 to MAX_TXS, odd and even
+LARGE_TXS = 1001  # Plus one block large enough for levels to reach the Numba kernel
+
+def reference_double_sha256(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+def reference_search(prefix76, start, end, target):
+    for nonce in range(start, end):
+        header = prefix76 + nonce.to_bytes(4, 'little')
+        if int.from_bytes(reference_double_sha256(header)[::-1], 'big') < target:
+            return nonce
+    return None
+
+def reference_merkle_root(hashes):
+    level = list(hashes)
+    while len(level) > 1:
+        if len(level) % 2 != 0:
+            level.append(level[-1])
+        level = [reference_double_sha256(level[i] + level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0]
+
+if __name__ == "__main__":
+    if sha256_numba is None:
+        print("numba not installed, skipping the Numba SHA256 kernels")
+    else:
+        for _ in range(NUM_SAMPLES):
+            header = os.urandom(80)
+            digest = sha256_numba.double_sha256_80(np.frombuffer(header, dtype=np.uint8))
+            assert digest.tobytes() == reference_double_sha256(header), header.hex()
+        print("✅ double_sha256_80 matches hashlib")
+
+        rows = np.frombuffer(os.urandom(64 * NUM_SAMPLES), dtype=np.uint8).reshape(NUM_SAMPLES, 64)
+        digests = sha256_numba.double_sha256_64_rows(rows)
+        for row, digest in zip(rows, digests):
+            assert digest.tobytes() == reference_double_sha256(row.tobytes()), row.tobytes().hex()
+        print("✅ double_sha256_64_rows matches hashlib")
+
+    # An easy target (about 1 nonce in 16 wins) and one no nonce can meet
+    prefix = os.urandom(76)
+    ranges = [(0, 200), (-5, 10), (1000, 1001), (2**32 - 40, 2**32 + 10)]
+    backends = [("hashlib", None)]
+    if miner_kernel.search_nonces is not None:
+        backends.append(("numba", miner_kernel.search_nonces))
+    for name, kernel in backends:
+        saved = miner_kernel.search_nonces
+        miner_kernel.search_nonces = kernel
+        try:
+            for target in (2**252, 1):
+                for start, end in ranges:
+                    expected = reference_search(prefix, max(0, start), min(end, 2**32), target)
+                    found = miner_kernel.search_nonce_range(prefix, start, end, target)
+                    assert found == expected, (name, start, end, target, found, expected)
+        finally:
+            miner_kernel.search_nonces = saved
+        print(f"✅ search_nonce_range ({name}) matches the reference search")
+
+    if sha256_cuda is not None and sha256_cuda.is_available():
+        for start, end in ranges:
+            expected = reference_search(prefix, max(0, start), min(end, 2**32), 2**252)
+            found = sha256_cuda.search_nonces_gpu(prefix, start, end - start, 2**252)
+            assert found == expected, (start, end, found, expected)
+        print("✅ search_nonces_gpu matches the reference search")
+
+    for n in list(range(1, MAX_TXS + 1)) + [LARGE_TXS]:
+        txs = np.frombuffer(os.urandom(32 * n), dtype=np.uint8).reshape(n, 32)
+        expected = reference_merkle_root([row.tobytes() for row in txs])
+        assert merkle_root(txs) == expected, n
+        assert compile_merkle(n)(txs) == expected, n
+        assert IncrementalMerkle(txs[1:]).root_with_coinbase(txs[0].tobytes()) == expected, n
+    print(f"✅ merkle_root, compile_merkle and IncrementalMerkle agree for 1 to {MAX_TXS} and {LARGE_TXS} transactions")